@@ -0,0 +1,54 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+LOG_MAX_BYTES = 10_000_000
+LOG_BACKUP_COUNT = 5
+
+_configured = False
+
+
+def configure_once() -> None:
+    """Настраивает общее логирование в терминал и файл, повторные вызовы ничего не делают.
+    Модули только кладут записи в очередь, форматирование и запись выполняет фоновый поток"""
+    global _configured
+    if _configured:
+        return
+
+    log_dir = Path(__file__).parent.parent / "logs"
+    log_dir.mkdir(exist_ok=True)
+
+    # Форматтер для логов
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    # Обработчик для терминала
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    # Обработчик для файла с ротацией; файл открывается только при первой записи
+    file_handler = RotatingFileHandler(
+        filename=log_dir / "app.log",
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
+    )
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    # Дописываем оставшиеся в очереди записи при завершении программы
+    atexit.register(listener.stop)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _configured = True
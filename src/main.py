@@ -1,7 +1,6 @@
 import os
 
-import pandas as pd
-
+from src.logging_config import configure_once
 from src.reports import get_spending_by_category
 from src.services import analyze_cashback_categories
 from src.views import generate_response, load_data
@@ -14,16 +13,15 @@ SETTINGS_PATH = os.getenv("SETTINGS_PATH")
 
 def main():
     """Основная функция выполнения"""
+    configure_once()
+
+    # Файл читается один раз, дальше все функции работают с одним DataFrame
     df = load_data(PATH_FILE)
+
     input_time = "2023-05-15 14:30:00"
     json_response = generate_response(input_time, df)
     print(json_response)
 
-    path_file = PATH_FILE
-
-    df = pd.read_excel(path_file)
-    df = df[df["Статус"] == "OK"]
-
     print("Отчет по категории 'Переводы':")
     result1 = get_spending_by_category(df, "Переводы")
     print(result1)
@@ -35,7 +33,7 @@ def main():
     year = 2021
     month = 10
 
-    result = analyze_cashback_categories(path_file, year, month)
+    result = analyze_cashback_categories(PATH_FILE, year, month, df=df)
     print(result)
 
 
@@ -1,36 +1,40 @@
-import json
 import logging
 from datetime import datetime, timedelta
-from pathlib import Path
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
 import pandas as pd
 from dotenv import load_dotenv
 
+from src.logging_config import configure_once
+from src.utils import dumps_json, dumps_json_bytes, load_data
 
-def setup_logging():
-    """Настройка логирования в терминал и файл"""
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
+logger = logging.getLogger(__name__)
 
-    log_file = logs_dir / "reports.log"
+load_dotenv(override=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
-    return logging.getLogger(__name__)
+default_filename = "../reports/report.json"
+last_days = 90  # последние три месяца
 
 
-logger = setup_logging()
+@lru_cache(maxsize=8)
+def _category_codes(category_names: Tuple[str, ...]) -> Dict[str, List[int]]:
+    """Сопоставляет нормализованные названия категорий их кодам (позициям в category_names)"""
+    codes = {}
+    for code, name in enumerate(category_names):
+        codes.setdefault(str(name).strip().lower(), []).append(code)
+    return codes
 
-load_dotenv(override=True)
 
-default_filename = "../reports/report.json"
-last_days = 90  # последние три месяца
+def category_mask(categories: pd.Series, search_category: str) -> pd.Series:
+    """Возвращает маску операций указанной категории без учета регистра и пробелов"""
+    if isinstance(categories.dtype, pd.CategoricalDtype):
+        # Названия нормализуются один раз для набора категорий, дальше сравниваются коды.
+        # Ключ кэша — кортеж категорий: неупорядоченные dtype с теми же категориями
+        # в другом порядке равны между собой, хотя коды у них разные
+        codes = _category_codes(tuple(categories.cat.categories)).get(search_category, [])
+        return categories.cat.codes.isin(codes)
+    return categories.str.strip().str.lower() == search_category
 
 
 def report_to_file(default_filename):
@@ -39,7 +43,7 @@ def report_to_file(default_filename):
     def decorator(func):
         def wrapper(*args, **kwargs):
             logger.info(
-                f"Вызов функции {func.__name__} с аргументами: {args}, {kwargs}"
+                "Вызов функции %s с аргументами: %s, %s", func.__name__, args, kwargs
             )
 
             try:
@@ -52,22 +56,22 @@ def report_to_file(default_filename):
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     output_filename = output_filename.format(timestamp=timestamp)
 
-                # Сохраняем результат в файл
-                with open(output_filename, "w", encoding="utf-8") as f:
-                    if isinstance(result, (dict, list)):
-                        json.dump(result, f, ensure_ascii=False, indent=4)
-                    else:
+                # Сохраняем результат в файл; JSON пишется готовыми байтами без перекодирования
+                if isinstance(result, (dict, list)):
+                    with open(output_filename, "wb") as f:
+                        f.write(dumps_json_bytes(result))
+                else:
+                    with open(output_filename, "w", encoding="utf-8") as f:
                         f.write(str(result))
 
-                logger.info(f"Отчет сохранен в файл: {output_filename}")
-                logger.debug(
-                    f"Результат отчета:\n{json.dumps(result, indent=2, ensure_ascii=False)}"
-                )
+                logger.info("Отчет сохранен в файл: %s", output_filename)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Результат отчета:\n%s", dumps_json(result))
                 return result
 
             except Exception as e:
                 logger.error(
-                    f"Ошибка в функции {func.__name__}: {str(e)}", exc_info=True
+                    "Ошибка в функции %s: %s", func.__name__, e, exc_info=True
                 )
                 raise
 
@@ -84,7 +88,7 @@ def get_spending_by_category(
 ) -> dict:
     """Анализирует траты по указанной категории за последние 3 месяца"""
     try:
-        logger.info(f"Начало обработки категории: {category}")
+        logger.info("Начало обработки категории: %s", category)
 
         # Преобразуем target_date в datetime
         target_date = (
@@ -92,7 +96,7 @@ def get_spending_by_category(
             if target_date is None
             else datetime.strptime(target_date, "%Y-%m-%d")
         )
-        logger.debug(f"Целевая дата: {target_date}")
+        logger.debug("Целевая дата: %s", target_date)
 
         # Проверяем необходимые колонки
         required_cols = ["Дата операции", "Категория", "Сумма операции"]
@@ -102,78 +106,84 @@ def get_spending_by_category(
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        df = transactions.copy()
-        logger.debug(f"Получено {len(df)} транзакций для анализа")
-
-        # Преобразуем даты
-        df["Дата операции"] = pd.to_datetime(
-            df["Дата операции"], dayfirst=True, errors="coerce"
-        )
-        df = df[df["Дата операции"].notna()]
-        logger.debug(f"После фильтрации по дате осталось {len(df)} транзакций")
-
-        # Фильтруем только расходы (отрицательные суммы)
-        df = df[df["Сумма операции"] < 0].copy()
-        df["Сумма операции"] = df["Сумма операции"].abs()
-        logger.debug(f"Найдено {len(df)} расходных операций")
+        df = transactions
+        logger.debug("Получено %s транзакций для анализа", len(df))
+
+        # Преобразуем даты, если DataFrame получен не из load_data
+        if not pd.api.types.is_datetime64_any_dtype(df["Дата операции"]):
+            df = df.assign(
+                **{
+                    "Дата операции": pd.to_datetime(
+                        df["Дата операции"], dayfirst=True, errors="coerce"
+                    )
+                }
+            )
+        dates = df["Дата операции"]
 
-        # Нормализуем названия категорий
-        df["Категория"] = df["Категория"].str.strip().str.lower()
         search_category = category.strip().lower()
-        logger.debug(f"Поиск категории: '{search_category}'")
+        logger.debug("Поиск категории: '%s'", search_category)
 
-        # Фильтруем по категории
-        category_transactions = df[df["Категория"] == search_category].copy()
-        logger.debug(f"Найдено {len(category_transactions)} операций по категории")
+        # Расходы (отрицательные суммы) по категории — одна общая маска
+        # вместо цепочки промежуточных DataFrame
+        in_category = (df["Сумма операции"] < 0) & category_mask(
+            df["Категория"], search_category
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Найдено %s расходных операций по категории", in_category.sum())
 
-        if category_transactions.empty:
+        if not in_category.any():
             msg = f"Нет транзакций по категории '{category}'"
             logger.warning(msg)
             return {"message": msg}
 
         # Рассчитываем диапазон дат
         start_date = target_date - timedelta(days=last_days)
-        logger.debug(f"Анализируем период с {start_date} по {target_date}")
+        logger.debug("Анализируем период с %s по %s", start_date, target_date)
 
-        # Фильтруем по дате
-        filtered = category_transactions[
-            (category_transactions["Дата операции"] >= start_date)
-            & (category_transactions["Дата операции"] <= target_date)
-        ].copy()
-        logger.debug(f"После фильтрации по дате осталось {len(filtered)} операций")
+        # Фильтруем по дате; некорректные даты (NaT) в диапазон не попадают
+        filtered = df[in_category & dates.between(start_date, target_date)]
+        logger.debug("После фильтрации по дате осталось %s операций", len(filtered))
 
         if filtered.empty:
             msg = f"Нет транзакций по категории '{category}' за последние 3 месяца"
             logger.warning(msg)
             return {"message": msg}
 
-        # Группируем по месяцам и суммируем
-        filtered.loc[:, "Месяц"] = filtered["Дата операции"].dt.to_period("M")
-        result = filtered.groupby("Месяц")["Сумма операции"].sum().to_dict()
-        result = {str(k): round(v, 2) for k, v in result.items()}
+        # Группируем по месяцам и суммируем без промежуточного столбца
+        monthly = (
+            filtered.groupby(
+                filtered["Дата операции"].dt.to_period("M"), observed=True, sort=False
+            )["Сумма операции"]
+            .sum()
+            .abs()
+            .round(2)
+        )
+        monthly.index = monthly.index.astype(str)
+        result = monthly.to_dict()
 
-        logger.info(f"Успешно сформирован отчет по категории '{category}'")
-        logger.debug(f"Результат:\n{json.dumps(result, indent=2, ensure_ascii=False)}")
+        logger.info("Успешно сформирован отчет по категории '%s'", category)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Результат:\n%s", dumps_json(result))
 
         return result
 
     except Exception as e:
         logger.error(
-            f"Ошибка при обработке категории '{category}': {str(e)}", exc_info=True
+            "Ошибка при обработке категории '%s': %s", category, e, exc_info=True
         )
         return {"error": str(e)}
 
 if __name__ == "__main__":
+    configure_once()
     try:
         logger.info("Запуск анализа расходов")
 
         # Загрузка данных из файла
         path_file = "../data/operations.xlsx"
-        logger.info(f"Загрузка данных из файла: {path_file}")
+        logger.info("Загрузка данных из файла: %s", path_file)
 
-        df = pd.read_excel(path_file)
-        df = df[df["Статус"] == "OK"]
-        logger.info(f"Загружено {len(df)} успешных операций")
+        df = load_data(path_file)
+        logger.info("Загружено %s успешных операций", len(df))
 
         print("Отчет по категории 'Переводы':")
         result1 = get_spending_by_category(df, "Переводы")
@@ -187,5 +197,5 @@ if __name__ == "__main__":
         logger.info("Анализ завершен успешно")
     except Exception as e:
         logger.critical(
-            f"Критическая ошибка при выполнении программы: {str(e)}", exc_info=True
+            "Критическая ошибка при выполнении программы: %s", e, exc_info=True
         )
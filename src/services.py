@@ -1,52 +1,43 @@
 import json
 import logging
 import os
-from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
+from src.logging_config import configure_once
+from src.utils import EXCEL_ENGINE, prepare_operations
 
-def setup_logging():
-    """Функция настройки логирования"""
+logger = logging.getLogger(__name__)
 
-    log_dir = Path(__file__).parent.parent / "logs"
-    log_dir.mkdir(exist_ok=True)
-
-    log_file = log_dir / "services.logs"
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),  # вывод в консоль
-            logging.FileHandler(log_file),  # запись в файл
-        ],
-    )
-    return logging.getLogger(__name__)
-
-
-logger = setup_logging()
 load_dotenv(override=True)
 
 
-def analyze_cashback_categories(path_file: str, year: int, month: int) -> str:
-    """Анализирует категории кэшбэка за указанный месяц и год и возвращает JSON-строку с категориями и суммами кэшбэка"""
+def analyze_cashback_categories(
+    path_file: str, year: int, month: int, df: pd.DataFrame = None
+) -> str:
+    """Анализирует категории кэшбэка за указанный месяц и год и возвращает JSON-строку с категориями и суммами кэшбэка.
+    Если передан уже загруженный DataFrame, файл повторно не читается"""
     try:
-        logger.info(f"Начало анализа кэшбэка за {month}.{year}")
+        logger.info("Начало анализа кэшбэка за %s.%s", month, year)
 
-        # Проверка существования файла
-        if not os.path.exists(path_file):
-            error_msg = f"Файл {path_file} не найден"
-            logger.error(error_msg)
-            raise FileNotFoundError(error_msg)
+        if df is None:
+            # Проверка существования файла
+            if not os.path.exists(path_file):
+                error_msg = f"Файл {path_file} не найден"
+                logger.error(error_msg)
+                raise FileNotFoundError(error_msg)
 
-        logger.info(f"Чтение файла: {path_file}")
-        df = pd.read_excel(path_file)
-        logger.debug(f"Прочитано {len(df)} строк")
+            logger.info("Чтение файла: %s", path_file)
+            df = pd.read_excel(path_file, engine=EXCEL_ENGINE)
+            logger.debug("Прочитано %s строк", len(df))
 
         # Проверка наличия необходимых столбцов
-        required_columns = ["Дата операции", "Статус", "Кэшбэк", "Категория"]
+        required_columns = ["Дата операции", "Кэшбэк", "Категория"]
+        if "_year" not in df.columns:
+            # Неподготовленные данные еще нужно отфильтровать по статусу
+            required_columns.insert(1, "Статус")
         missing_columns = [col for col in required_columns if col not in df.columns]
         if missing_columns:
             error_msg = (
@@ -55,50 +46,48 @@ def analyze_cashback_categories(path_file: str, year: int, month: int) -> str:
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        # Преобразование даты
-        logger.info("Преобразование дат...")
-        df["Дата операции"] = pd.to_datetime(
-            df["Дата операции"], dayfirst=True, errors="coerce"
-        )
-
-        # Удаление строк с некорректными датами
-        initial_count = len(df)
-        df = df[df["Дата операции"].notna()]
-        removed_count = initial_count - len(df)
-        if removed_count > 0:
-            logger.warning(f"Удалено {removed_count} строк с некорректными датами")
-
-        # Обработка кэшбэка
-        logger.info("Проверка данных кэшбэка...")
-        df = df[df["Кэшбэк"].notna()]
-        df["Кэшбэк"] = pd.to_numeric(df["Кэшбэк"], errors="coerce")
-        df = df[df["Кэшбэк"].notna()]
-
-        # Фильтрация данных
-        logger.info(f"Фильтрация данных за {month}.{year}...")
-        filtered_df = df[
-            (df["Дата операции"].dt.year == year)
-            & (df["Дата операции"].dt.month == month)
-            & (df["Статус"].str.strip().str.upper() == "OK")
-        ]
-
-        if filtered_df.empty:
-            logger.warning(f"Нет данных за указанный период {month}.{year}")
+        # Данные из load_data уже подготовлены, остальные готовим здесь
+        if "_year" not in df.columns:
+            logger.info("Преобразование дат и кэшбэка...")
+            # Даты в произвольном виде разбираются так же, как в reports, а не строгим форматом load_data
+            if not pd.api.types.is_datetime64_any_dtype(df["Дата операции"]):
+                df = df.assign(
+                    **{"Дата операции": pd.to_datetime(df["Дата операции"], dayfirst=True, errors="coerce")}
+                )
+            df = prepare_operations(df)
+
+        # Фильтрация данных одной маской по заранее посчитанным году и месяцу;
+        # неуспешные операции отброшены еще при подготовке данных
+        logger.info("Фильтрация данных за %s.%s...", month, year)
+        in_period = (df["_year"].to_numpy() == year) & (df["_month"].to_numpy() == month)
+
+        if not in_period.any():
+            logger.warning("Нет данных за указанный период %s.%s", month, year)
             return json.dumps({}, ensure_ascii=False, indent=4)
 
         # Анализ кэшбэка
         logger.info("Анализ кэшбэка...")
-        cashback_df = filtered_df[filtered_df["Кэшбэк"] > 0]
+        categories = df["Категория"].astype("category").cat
+        codes = categories.codes.to_numpy()
+        cashback = df["Кэшбэк"].to_numpy(dtype="float64", na_value=np.nan)
+        # Некорректные значения кэшбэка уже заменены на NaN и не проходят сравнение
+        selected = in_period & (cashback > 0) & (codes >= 0)
 
-        if cashback_df.empty:
+        if not selected.any():
             logger.warning("Нет операций с кэшбэком в указанный период")
             return json.dumps({}, ensure_ascii=False, indent=4)
 
-        result = cashback_df.groupby("Категория")["Кэшбэк"].sum()
+        # Суммы по кодам категорий одним проходом вместо groupby
+        totals = np.bincount(
+            codes[selected],
+            weights=cashback[selected],
+            minlength=len(categories.categories),
+        )
+        result = pd.Series(totals, index=categories.categories)[totals > 0]
         sorted_result = result.sort_values(ascending=False).to_dict()
 
         logger.info(
-            f"Анализ завершен. Найдено {len(sorted_result)} категорий с кэшбэком"
+            "Анализ завершен. Найдено %s категорий с кэшбэком", len(sorted_result)
         )
         return json.dumps(sorted_result, ensure_ascii=False, indent=4)
 
@@ -106,23 +95,25 @@ def analyze_cashback_categories(path_file: str, year: int, month: int) -> str:
         logger.error(str(e))
         return json.dumps({"error": str(e)}, ensure_ascii=False)
     except ValueError as e:
-        logger.error(f"Ошибка в данных: {e}")
+        logger.error("Ошибка в данных: %s", e)
         return json.dumps({"error": str(e)}, ensure_ascii=False)
     except pd.errors.EmptyDataError:
         logger.error("Файл не содержит данных")
         return json.dumps({"error": "Файл не содержит данных"}, ensure_ascii=False)
     except Exception as e:
-        logger.error(f"Неожиданная ошибка: {str(e)}", exc_info=True)
+        logger.error("Неожиданная ошибка: %s", e, exc_info=True)
         return json.dumps({"error": "Внутренняя ошибка сервера"}, ensure_ascii=False)
 
 
 if __name__ == "__main__":
+    configure_once()
+
     # Пример использования
     path_file = "../data/operations.xlsx"
     year = 2021
     month = 10
 
-    logger.info(f"Запуск анализа кэшбэка за {month}.{year}")
+    logger.info("Запуск анализа кэшбэка за %s.%s", month, year)
     result = analyze_cashback_categories(path_file, year, month)
     print(result)
     logger.info("Программа завершена")
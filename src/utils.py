@@ -1,47 +1,142 @@
 import json
 import logging
 import os
-from functools import lru_cache
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def setup_logging():
-    """Настраивает логирование в терминал и файл"""
-    log_dir = Path(__file__).parent.parent / "logs"
-    log_dir.mkdir(exist_ok=True)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
 
-    # Форматтер для логов
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+try:
+    import python_calamine  # noqa: F401
 
-    # Обработчик для терминала
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    # Rust-движок calamine разбирает xlsx в разы быстрее openpyxl
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None  # pandas использует openpyxl
 
-    # Обработчик для файла
-    file_handler = logging.FileHandler(filename=log_dir / "views.log", encoding="utf-8")
-    file_handler.setFormatter(formatter)
+logger = logging.getLogger(__name__)
 
-    # Добавляем обработчики
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+load_dotenv(override=True)
 
-    return logger
 
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+MAX_STOCK_WORKERS = 8
+BULK_QUOTES_LIMIT = 100  # максимум акций в одном запросе REALTIME_BULK_QUOTES
+
+# Столбцы операций, с которыми работают отчеты; остальные не загружаются
+USECOLS = [
+    "Дата операции",
+    "Категория",
+    "Сумма операции",
+    "Статус",
+    "Кэшбэк",
+    "Номер карты",
+    "Описание",
+]
+# Столбцы, которые prepare_operations вычисляет при загрузке
+DERIVED_COLUMNS = ("_year", "_month")
+
+# Версия формата Parquet-кэша операций: повышать при каждом изменении prepare_operations,
+# иначе load_data вернет данные, подготовленные старым кодом
+CACHE_VERSION = 3
+_CACHE_VERSION_KEY = b"operations_cache_version"
+
+HTTP_CACHE_TTL = 300  # секунд
+API_CACHE_TTL = 60  # секунд
+USER_AGENT = "skyprocoursework-01/0.1.0"
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+EXCHANGE_RATES_URL = "https://api.apilayer.com/exchangerates_data/latest"
+# Валюты и акции, если они не заданы в пользовательских настройках
+DEFAULT_CURRENCIES = ("USD", "EUR")
+DEFAULT_STOCKS = ("AAPL", "AMZN", "GOOGL", "MSFT", "TSLA")
+
+
+def _is_cacheable_response(response: requests.Response) -> bool:
+    """Проверяет, можно ли сохранить ответ API в HTTP-кэше.
+    Alpha Vantage сообщает о лимитах и ошибках ответом 200, такие ответы не кэшируются"""
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    if isinstance(data, dict):
+        if any(key in data for key in ("Note", "Information", "Error Message")):
+            return False
+        if data.get("success") is False:
+            return False
+    return True
+
+
+def create_session() -> requests.Session:
+    """Создает HTTP-сессию для запросов к API.
+    Если установлен requests-cache, ответы кэшируются на диске на HTTP_CACHE_TTL секунд"""
+    if requests_cache is None:
+        session = requests.Session()
+    else:
+        cache_dir = Path(__file__).parent.parent / "cache"
+        cache_dir.mkdir(exist_ok=True)
+        session = requests_cache.CachedSession(
+            str(cache_dir / "http_cache"),
+            expire_after=HTTP_CACHE_TTL,
+            allowable_methods=("GET",),
+            filter_fn=_is_cacheable_response,
+        )
 
-logger = setup_logging()
+    # Пул соединений рассчитан на все параллельные запросы котировок,
+    # кратковременные сбои сети и сервера повторяются с паузой
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_STOCK_WORKERS, max_retries=retries)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
 
-load_dotenv(override=True)
+
+# Общая сессия переиспользует соединения между запросами к API.
+# Создается при первом запросе, чтобы импорт модуля не создавал каталог и файл кэша
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Возвращает общую HTTP-сессию, создавая ее при первом обращении"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+# Загруженные операции: путь к файлу -> (время изменения файла, DataFrame)
+_DF_CACHE: Dict[str, Tuple[float, pd.DataFrame]] = {}
+
+# Сбрасывается, если пакетный эндпоинт котировок недоступен для ключа API
+_bulk_quotes_available = True
 
 
 class Config:
@@ -51,122 +146,409 @@ class Config:
     SETTINGS_PATH = os.getenv("SETTINGS_PATH")
 
 
+def loads_json(data: bytes):
+    """Разбирает JSON, используя orjson, если он установлен"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_json_bytes(data) -> bytes:
+    """Сериализует данные в JSON (UTF-8) с отступом в 2 пробела, используя orjson, если он установлен"""
+    if orjson is not None:
+        options = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return orjson.dumps(data, option=options)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def dumps_json(data) -> str:
+    """Сериализует данные в JSON-строку с отступом в 2 пробела"""
+    return dumps_json_bytes(data).decode("utf-8")
+
+
+def _default_settings() -> Dict:
+    """Возвращает пользовательские настройки по умолчанию"""
+    return {
+        "user_currencies": list(DEFAULT_CURRENCIES),
+        "user_stocks": list(DEFAULT_STOCKS),
+    }
+
+
 @lru_cache(maxsize=1)
 def load_user_settings() -> Dict:
-    """Загружает пользовательские настройки из JSON-файла"""
+    """Загружает пользовательские настройки из JSON-файла.
+    При любой проблеме с файлом возвращает настройки по умолчанию"""
+    if not Config.SETTINGS_PATH:
+        logger.warning("Путь к файлу настроек не задан. Используются настройки по умолчанию.")
+        return _default_settings()
     try:
-        with open(Config.SETTINGS_PATH, "r", encoding="utf-8") as f:
-            settings = json.load(f)
-            logger.info("Настройки пользователя успешно загружены")
-            return settings
+        with open(Config.SETTINGS_PATH, "rb") as f:
+            settings = loads_json(f.read())
     except FileNotFoundError:
         logger.warning(
-            f"Файл настроек {Config.SETTINGS_PATH} не найден. Используются настройки по умолчанию."
+            "Файл настроек %s не найден. Используются настройки по умолчанию.", Config.SETTINGS_PATH
         )
-        return {
-            "user_currencies": ["USD", "EUR"],
-            "user_stocks": ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"],
-        }
-    except json.JSONDecodeError as e:
-        logger.error(f"Ошибка чтения файла {Config.SETTINGS_PATH}: {str(e)}")
-        return {
-            "user_currencies": ["USD", "EUR"],
-            "user_stocks": ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"],
-        }
+        return _default_settings()
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error("Ошибка чтения файла %s: %s", Config.SETTINGS_PATH, e)
+        return _default_settings()
+
+    if not isinstance(settings, dict):
+        logger.error("Файл настроек %s должен содержать JSON-объект", Config.SETTINGS_PATH)
+        return _default_settings()
+    logger.info("Настройки пользователя успешно загружены")
+    return settings
+
+
+def ensure_datetime(dates: pd.Series, **kwargs) -> pd.Series:
+    """Преобразует даты в datetime, если они не были преобразованы при загрузке"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, **kwargs)
+
+
+def _downcast_float(values: pd.Series) -> pd.Series:
+    """Приводит значения к числам и переводит их в float32, если это не искажает ни значения, ни их суммы"""
+    numbers = pd.to_numeric(values, errors="coerce")
+    downcast = numbers.astype("float32")
+    # float32 точно хранит целые числа только до 2**24, копейки не всегда представимы
+    if downcast.astype("float64").equals(numbers.astype("float64")) and numbers.abs().sum() < 2**24:
+        return downcast
+    return numbers
+
+
+def prepare_operations(df: pd.DataFrame) -> pd.DataFrame:
+    """Один раз приводит столбцы операций к рабочим типам сразу после чтения файла"""
+    df = df.copy(deep=False)
+    # cache=True разбирает каждую повторяющуюся строку даты только один раз
+    df["Дата операции"] = ensure_datetime(df["Дата операции"], format=DATE_FORMAT, errors="coerce", cache=True)
+
+    # Удаление строк с некорректными датами
+    invalid_dates = df["Дата операции"].isna()
+    if invalid_dates.any():
+        logger.warning("Удалено %s строк с некорректными датами", invalid_dates.sum())
+        df = df[~invalid_dates]
+
+    # Год и месяц операции для быстрых фильтров по периоду
+    df["_year"] = df["Дата операции"].dt.year.astype("int16")
+    df["_month"] = df["Дата операции"].dt.month.astype("int8")
+
+    # Суммы остаются float64: из них считаются кэшбэк и итоги, а арифметика во float32
+    # дает значения вроде 13.34000015 даже для целых рублей
+    if "Сумма операции" in df.columns:
+        df["Сумма операции"] = pd.to_numeric(df["Сумма операции"], errors="coerce").astype("float64")
+    if "Кэшбэк" in df.columns:
+        df["Кэшбэк"] = _downcast_float(df["Кэшбэк"])
+
+    # Категории хранятся как category: фильтры сравнивают коды, а не строки
+    if "Категория" in df.columns:
+        df["Категория"] = df["Категория"].str.strip().astype("category")
+    if "Номер карты" in df.columns:
+        df["Номер карты"] = df["Номер карты"].astype("string")
+    # В анализ попадают только успешные операции, после фильтра статус больше не нужен
+    if "Статус" in df.columns:
+        is_ok = df["Статус"].astype("string").str.strip().str.upper() == "OK"
+        df = df[is_ok.fillna(False)].drop(columns=["Статус"]).reset_index(drop=True)
+    return df
+
+
+def _read_excel(file_path: str) -> pd.DataFrame:
+    """Читает нужные столбцы операций из Excel файла и подготавливает их"""
+    # Номер карты сразу читается строкой, без промежуточного определения типа по значениям
+    df = pd.read_excel(
+        file_path,
+        engine=EXCEL_ENGINE,
+        usecols=lambda col: col in USECOLS,
+        dtype={"Номер карты": "string"},
+    )
+    return prepare_operations(df)
 
 
-def load_data(file_path: str) -> pd.DataFrame:
-    """Загружает данные из Excel файла"""
+def _read_parquet(file_path: str) -> pd.DataFrame:
+    """Читает из Parquet файла только нужные столбцы операций и подготавливает их"""
+    columns = None
+    if pq is not None:
+        columns = [
+            name for name in pq.read_schema(file_path).names if name in USECOLS or name in DERIVED_COLUMNS
+        ]
+    return prepare_operations(pd.read_parquet(file_path, engine="pyarrow", columns=columns))
+
+
+def _read_operations_cache(cache_path: str, mtime: float) -> Optional[pd.DataFrame]:
+    """Читает Parquet-кэш операций, если он не старше исходного файла и записан текущей версией кода"""
+    if pq is None or not os.path.exists(cache_path) or os.path.getmtime(cache_path) < mtime:
+        return None
     try:
-        df = pd.read_excel(file_path)
-        logger.info(f"Данные успешно загружены из {file_path}")
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if metadata.get(_CACHE_VERSION_KEY) != str(CACHE_VERSION).encode():
+            logger.info("Кэш %s записан другой версией и будет пересоздан", cache_path)
+            return None
+        return pd.read_parquet(cache_path, engine="pyarrow")
+    except Exception as e:
+        logger.warning("Не удалось прочитать кэш %s: %s", cache_path, e)
+        return None
+
+
+def _write_operations_cache(df: pd.DataFrame, cache_path: str) -> None:
+    """Сохраняет подготовленные операции в Parquet-кэш с отметкой версии"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), _CACHE_VERSION_KEY: str(CACHE_VERSION).encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), cache_path, compression="zstd")
+
+
+def _read_operations(file_path: str, mtime: float) -> pd.DataFrame:
+    """Читает операции из Parquet или Excel файла.
+    Для Excel используется Parquet-кэш рядом с файлом, если он не старше самого файла и той же версии"""
+    if Path(file_path).suffix.lower() == ".parquet":
+        df = _read_parquet(file_path)
+        logger.info("Данные успешно загружены из %s", file_path)
         return df
+
+    cache_path = f"{file_path}.parquet"
+    df = _read_operations_cache(cache_path, mtime)
+    if df is not None:
+        logger.info("Данные загружены из кэша %s", cache_path)
+        return df
+
+    df = _read_excel(file_path)
+    logger.info("Данные успешно загружены из %s", file_path)
+
+    try:
+        _write_operations_cache(df, cache_path)
+        logger.debug("Данные сохранены в кэш %s", cache_path)
+    except Exception as e:
+        logger.warning("Не удалось сохранить кэш %s: %s", cache_path, e)
+    return df
+
+
+def convert_xlsx_to_parquet(xlsx_path: str, parquet_path: str = None) -> str:
+    """Один раз конвертирует Excel файл операций в Parquet и возвращает путь к нему.
+    Полученный файл можно передавать в load_data вместо Excel"""
+    if parquet_path is None:
+        parquet_path = str(Path(xlsx_path).with_suffix(".parquet"))
+
+    df = _read_excel(xlsx_path)
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd")
+    logger.info("Файл %s сконвертирован в %s", xlsx_path, parquet_path)
+    return parquet_path
+
+
+def load_data(file_path: str) -> pd.DataFrame:
+    """Загружает данные из Excel или Parquet файла.
+    Результат кэшируется в памяти и в Parquet-файле рядом с исходным и используется, пока Excel файл не изменится"""
+    try:
+        mtime = os.path.getmtime(file_path)
+        cache_key = os.path.abspath(file_path)
+        cached = _DF_CACHE.get(cache_key)
+        if cached is None or cached[0] != mtime:
+            _DF_CACHE[cache_key] = (mtime, _read_operations(file_path, mtime))
+        else:
+            logger.debug("Данные %s взяты из памяти", file_path)
+        # Поверхностная копия защищает кэш от добавления и замены столбцов вызывающей стороной
+        return _DF_CACHE[cache_key][1].copy(deep=False)
     except Exception as e:
-        logger.error(f"Ошибка загрузки файла {file_path}: {str(e)}")
+        logger.error("Ошибка загрузки файла %s: %s", file_path, e)
         raise
 
 
-def get_stock_prices() -> List[Dict[str, float]]:
-    """Получает текущие цены акций через Alpha Vantage API"""
-    if not Config.ALPHA_VANTAGE_API_KEY:
-        logger.error("API ключ для Alpha Vantage не найден")
-        raise ValueError("API ключ для Alpha Vantage не найден")
+class Uncached:
+    """Результат, который ttl_cache возвращает вызывающему, но не сохраняет.
+    Нужен для ответов-заглушек при ошибках, чтобы они не подменяли реальные данные на время ttl"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def ttl_cache(ttl: float, maxsize: int = 32):
+    """Декоратор кэширует результат функции на ttl секунд, храня не больше maxsize последних результатов.
+    Одновременные вызовы с теми же аргументами ждут один общий запрос, а не отправляют свои"""
 
+    def decorator(func):
+        cache = OrderedDict()  # аргументы -> (время истечения, результат), от старых к новым
+        in_flight = {}  # аргументы -> Future выполняющегося вызова
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args):
+            with lock:
+                cached = cache.get(args)
+                if cached is not None:
+                    if cached[0] > time.monotonic():
+                        cache.move_to_end(args)
+                        return cached[1]
+                    del cache[args]
+                future = in_flight.get(args)
+                is_owner = future is None
+                if is_owner:
+                    future = in_flight[args] = Future()
+
+            if not is_owner:
+                return future.result()
+
+            try:
+                result = func(*args)
+            except BaseException as e:
+                with lock:
+                    del in_flight[args]
+                future.set_exception(e)
+                raise
+
+            with lock:
+                if isinstance(result, Uncached):
+                    result = result.value
+                else:
+                    cache[args] = (time.monotonic() + ttl, result)
+                    cache.move_to_end(args)
+                    if len(cache) > maxsize:
+                        cache.popitem(last=False)
+                del in_flight[args]
+            future.set_result(result)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def _fetch_stock_price(symbol: str) -> Optional[Dict[str, float]]:
+    """Получает текущую цену одной акции, при ошибке возвращает None"""
     try:
-        user_settings = load_user_settings()
-        symbols = user_settings.get(
-            "user_stocks", ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"]
+        params = {"function": "GLOBAL_QUOTE", "symbol": symbol, "apikey": Config.ALPHA_VANTAGE_API_KEY}
+        response = _get_session().get(ALPHA_VANTAGE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        if "Global Quote" in data:
+            price = float(data["Global Quote"]["05. price"])
+            logger.debug("Успешно получена цена для %s", symbol)
+            return {"stock": symbol, "price": round(price, 2)}
+        logger.warning(
+            "Не удалось получить данные для %s: %s", symbol, data.get('Note', 'Unknown error')
         )
-        stock_prices = []
+    except requests.exceptions.RequestException as e:
+        logger.error("Ошибка сети при запросе цены акции %s: %s", symbol, e)
+    except Exception as e:
+        logger.error("Ошибка при обработке данных для %s: %s", symbol, e)
+    return None
+
 
-        for symbol in symbols:
+def _fetch_bulk_stock_prices(symbols: Tuple[str, ...]) -> Optional[Dict[str, float]]:
+    """Получает цены нескольких акций одним запросом REALTIME_BULK_QUOTES.
+    Возвращает None при любой ошибке, чтобы вызывающий запросил акции по одной"""
+    global _bulk_quotes_available
+    try:
+        params = {
+            "function": "REALTIME_BULK_QUOTES",
+            "symbol": ",".join(symbols),
+            "apikey": Config.ALPHA_VANTAGE_API_KEY,
+        }
+        response = _get_session().get(ALPHA_VANTAGE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        quotes = data.get("data") if isinstance(data, dict) else None
+        if not isinstance(quotes, list):
+            message = str(data.get("Information") or data.get("Note") or "") if isinstance(data, dict) else ""
+            # Эндпоинт премиальный: с бесплатным ключом повторять запрос бессмысленно.
+            # Сообщение о дневном лимите тоже упоминает premium, но не "premium endpoint"
+            if "premium endpoint" in message.lower():
+                _bulk_quotes_available = False
+            logger.info("Пакетный запрос цен акций недоступен: %s", message or data)
+            return None
+
+        prices = {}
+        for quote in quotes:
             try:
-                url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={Config.ALPHA_VANTAGE_API_KEY}"
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-
-                if "Global Quote" in data:
-                    price = float(data["Global Quote"]["05. price"])
-                    stock_prices.append({"stock": symbol, "price": round(price, 2)})
-                    logger.debug(f"Успешно получена цена для {symbol}")
-                else:
-                    logger.warning(
-                        f"Не удалось получить данные для {symbol}: {data.get('Note', 'Unknown error')}"
-                    )
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка сети при запросе цены акции {symbol}: {str(e)}")
-            except Exception as e:
-                logger.error(f"Ошибка при обработке данных для {symbol}: {str(e)}")
+                prices[quote["symbol"]] = round(float(quote["close"]), 2)
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Некорректная котировка в пакетном ответе: %s", quote)
+        return prices
+    except requests.exceptions.RequestException as e:
+        logger.warning("Ошибка сети при пакетном запросе цен акций: %s", e)
+    except Exception as e:
+        logger.warning("Ошибка при обработке пакетного ответа с ценами акций: %s", e)
+    return None
+
+
+@ttl_cache(API_CACHE_TTL)
+def get_stock_prices(symbols: Tuple[str, ...]) -> List[Dict[str, float]]:
+    """Получает текущие цены акций symbols через Alpha Vantage API.
+    Сначала пробует один пакетный запрос, оставшиеся акции запрашиваются параллельно по одной"""
+    if not Config.ALPHA_VANTAGE_API_KEY:
+        logger.error("API ключ для Alpha Vantage не найден")
+        raise ValueError("API ключ для Alpha Vantage не найден")
 
+    try:
+        if not symbols:
+            return []
+
+        prices = {}
+        if _bulk_quotes_available and len(symbols) <= BULK_QUOTES_LIMIT:
+            prices = _fetch_bulk_stock_prices(symbols) or {}
+
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(MAX_STOCK_WORKERS, len(missing))) as executor:
+                for stock_price in executor.map(_fetch_stock_price, missing):
+                    if stock_price is not None:
+                        prices[stock_price["stock"]] = stock_price["price"]
+
+        stock_prices = [{"stock": symbol, "price": prices[symbol]} for symbol in symbols if symbol in prices]
+        # Неполный ответ не кэшируется, чтобы следующий вызов снова запросил недостающие акции
+        if len(stock_prices) < len(symbols):
+            return Uncached(stock_prices)
         return stock_prices
     except Exception as e:
-        logger.error(f"Общая ошибка при получении цен акций: {str(e)}")
-        return []
+        logger.error("Общая ошибка при получении цен акций: %s", e)
+        return Uncached([])
 
 
-def get_currency_rate() -> Dict:
-    """Получает курс валют с учетом пользовательских настроек"""
+@ttl_cache(API_CACHE_TTL)
+def get_currency_rate(currencies: Tuple[str, ...]) -> Dict:
+    """Получает курсы валют currencies к рублю"""
     try:
-        user_settings = load_user_settings()
-        currencies = user_settings.get("user_currencies", ["USD", "EUR"])
-
         if not Config.CURRENCY_API_KEY:
             logger.error("API ключ для курсов валют не найден")
             raise ValueError("API ключ для курсов валют не найден")
 
-        symbols_param = "%2C".join(currencies)
-        url = f"https://api.apilayer.com/exchangerates_data/latest?symbols={symbols_param}&base=RUB"
-
-        response = requests.get(
-            url, headers={"apikey": Config.CURRENCY_API_KEY}, timeout=10
+        # requests сам кодирует параметры запроса, включая запятые в списке валют
+        response = _get_session().get(
+            EXCHANGE_RATES_URL,
+            params={"symbols": ",".join(currencies), "base": "RUB"},
+            headers={"apikey": Config.CURRENCY_API_KEY},
+            timeout=10,
         )
         response.raise_for_status()
         logger.info("Курсы валют успешно получены")
         return response.json()
     except requests.exceptions.RequestException as e:
-        logger.error(f"Ошибка сети при получении курсов валют: {str(e)}")
+        logger.error("Ошибка сети при получении курсов валют: %s", e)
     except Exception as e:
-        logger.error(f"Ошибка при получении курсов валют: {str(e)}")
-    return {"rates": {}}
+        logger.error("Ошибка при получении курсов валют: %s", e)
+    # Пустые курсы не кэшируются: после восстановления API следующий вызов получит реальные данные
+    return Uncached({"rates": {}})
 
 
-def format_currency_rates(api_data: Dict) -> List[Dict[str, float]]:
-    """Форматирует данные о курсах валют"""
+def format_currency_rates(api_data: Dict, currencies: Sequence[str]) -> List[Dict[str, float]]:
+    """Форматирует данные о курсах валют currencies"""
     try:
-        user_settings = load_user_settings()
-        currencies = user_settings.get("user_currencies", ["USD", "EUR"])
         rates = api_data.get("rates", {})
 
-        formatted_rates = []
-        for currency in currencies:
-            rate = rates.get(currency, 1)
-            formatted_rates.append(
-                {"currency": currency, "rate": round(1 / rate, 2) if rate != 0 else 0.0}
-            )
+        # Обратные курсы считаются одной векторной операцией
+        rates_arr = np.fromiter(
+            (rates.get(currency, 1.0) for currency in currencies), dtype=np.float64, count=len(currencies)
+        )
+        with np.errstate(divide="ignore"):
+            inverted = np.where(rates_arr != 0, np.round(1.0 / rates_arr, 2), 0.0)
+        formatted_rates = [
+            {"currency": currency, "rate": float(rate)} for currency, rate in zip(currencies, inverted)
+        ]
 
         logger.debug("Курсы валют успешно отформатированы")
         return formatted_rates
     except Exception as e:
-        logger.error(f"Ошибка форматирования курсов валют: {str(e)}")
+        logger.error("Ошибка форматирования курсов валют: %s", e)
         return [{"currency": "USD", "rate": 73.21}, {"currency": "EUR", "rate": 87.08}]
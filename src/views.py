@@ -1,131 +1,180 @@
-import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from src.utils import get_currency_rate, format_currency_rates, get_stock_prices, load_data, logger, Config
+from src.logging_config import configure_once
+from src.utils import (
+    DATE_FORMAT,
+    DEFAULT_CURRENCIES,
+    DEFAULT_STOCKS,
+    Config,
+    dumps_json,
+    ensure_datetime,
+    format_currency_rates,
+    get_currency_rate,
+    get_stock_prices,
+    load_data,
+    load_user_settings,
+)
 
+logger = logging.getLogger(__name__)
 
-def get_greeting(time_str: str) -> str:
-    """Возвращает приветствие в зависимости от времени суток"""
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Границы периодов суток (часы начала утра, дня, вечера и ночи) и их приветствия
+_GREETING_BOUNDS = np.array([5, 12, 17, 23])
+_GREETING_LABELS = np.array(["Доброй ночи", "Доброе утро", "Добрый день", "Добрый вечер", "Доброй ночи"])
+# Приветствие для каждого часа суток (индекс — час)
+_GREETING_BY_HOUR = _GREETING_LABELS[np.digitize(np.arange(24), _GREETING_BOUNDS)].tolist()
+
+
+def get_greeting_by_hour(hour: int) -> str:
+    """Возвращает приветствие для указанного часа"""
+    return _GREETING_BY_HOUR[hour]
+
+
+def greetings_for(times: np.ndarray) -> np.ndarray:
+    """Возвращает массив приветствий для массива моментов времени datetime64"""
+    hours = np.asarray(times, dtype="datetime64[h]").astype(np.int64) % 24
+    return _GREETING_LABELS[np.digitize(hours, _GREETING_BOUNDS)]
+
+
+def parse_datetime(time_str: str) -> Optional[datetime]:
+    """Разбирает строку формата DATETIME_FORMAT, при ошибке возвращает None"""
     try:
-        dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-        hour = dt.hour
-
-        if 5 <= hour < 12:
-            return "Доброе утро"
-        elif 12 <= hour < 17:
-            return "Добрый день"
-        elif 17 <= hour < 23:
-            return "Добрый вечер"
-        return "Доброй ночи"
-    except ValueError as e:
-        logger.error(f"Неверный формат времени: {time_str}. Ошибка: {str(e)}")
+        return datetime.strptime(time_str, DATETIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def get_greeting(moment: Union[str, datetime]) -> str:
+    """Возвращает приветствие в зависимости от времени суток.
+    Принимает строку формата DATETIME_FORMAT или уже разобранный datetime"""
+    if isinstance(moment, datetime):
+        return _GREETING_BY_HOUR[moment.hour]
+
+    # Быстрый путь: час берется прямо из строки "ГГГГ-ММ-ДД ЧЧ:ММ:СС".
+    # isascii отсекает символы вроде "²", для которых isdigit истинно, а int падает
+    hour_str = moment[11:13]
+    if len(moment) == 19 and moment[10] == " " and hour_str.isascii() and hour_str.isdigit():
+        hour = int(hour_str)
+        if hour < 24:
+            return _GREETING_BY_HOUR[hour]
+
+    dt = parse_datetime(moment)
+    if dt is None:
+        logger.error("Неверный формат времени: %s", moment)
         return "Добрый день"
+    return get_greeting_by_hour(dt.hour)
 
 
 def process_cards_data(df: pd.DataFrame) -> List[Dict]:
     """Обрабатывает данные по картам"""
     try:
-        df["last_digits"] = df["Номер карты"].str.extract(r"\*(\d{4})")
-        cards_grouped = (
-            df[df["Сумма операции"] < 0].groupby("last_digits")["Сумма операции"].sum()
-        )
+        # Номер карты хранится в формате "*1234": последние 4 символа — цифры карты
+        expenses = df[df["Номер карты"].notna() & (df["Сумма операции"] < 0)]
+        last_digits = expenses["Номер карты"].str[-4:].rename("last_digits")
+        cards_grouped = expenses["Сумма операции"].groupby(last_digits).sum()
 
-        cards_data = []
-        for last_digits, total_spent in cards_grouped.items():
-            cards_data.append(
-                {
-                    "last_digits": last_digits,
-                    "total_spent": abs(round(total_spent, 2)),
-                    "cashback": abs(round(total_spent / 100, 2)),
-                }
-            )
+        totals = cards_grouped.abs()
+        cards_df = totals.round(2).reset_index(name="total_spent")
+        cards_df["cashback"] = (totals / 100).round(2).to_numpy()
+        cards_data = cards_df.to_dict(orient="records")
 
-        logger.info(f"Обработано {len(cards_data)} карт")
+        logger.info("Обработано %s карт", len(cards_data))
         return cards_data
     except Exception as e:
-        logger.error(f"Ошибка обработки данных карт: {str(e)}")
+        logger.error("Ошибка обработки данных карт: %s", e)
         return []
 
 
 def process_top_transactions(df: pd.DataFrame, n: int = 5) -> List[Dict]:
-    """Обрабатывает топ-N транзакций"""
+    """Обрабатывает топ-N самых крупных расходных транзакций"""
     try:
-        expenses_df = df[df["Сумма операции"] < 0].copy()
-        expenses_df["date"] = pd.to_datetime(
-            expenses_df["Дата операции"], format="%d.%m.%Y %H:%M:%S", dayfirst=True
-        ).dt.strftime("%d.%m.%Y")
-
-        top_transactions = expenses_df.nlargest(n, "Сумма операции", keep="all")
-        transactions_list = []
-
-        for _, row in top_transactions.iterrows():
-            transactions_list.append(
-                {
-                    "date": row["date"],
-                    "amount": abs(round(row["Сумма операции"], 2)),
-                    "category": row["Категория"],
-                    "description": row["Описание"],
-                }
+        # Самые крупные расходы — наименьшие (отрицательные) суммы;
+        # даты форматируются только для отобранных N операций
+        expenses = df[df["Сумма операции"] < 0]
+        top = expenses.nsmallest(n, "Сумма операции", keep="all")
+        transactions_list = (
+            top.assign(
+                date=ensure_datetime(top["Дата операции"], format=DATE_FORMAT).dt.strftime("%d.%m.%Y"),
+                amount=top["Сумма операции"].abs().round(2),
             )
+            .rename(columns={"Категория": "category", "Описание": "description"})[
+                ["date", "amount", "category", "description"]
+            ]
+            .to_dict(orient="records")
+        )
 
-        logger.info(f"Обработано {len(transactions_list)} транзакций")
+        logger.info("Обработано %s транзакций", len(transactions_list))
         return transactions_list
     except Exception as e:
-        logger.error(f"Ошибка обработки транзакций: {str(e)}")
+        logger.error("Ошибка обработки транзакций: %s", e)
         return []
 
 
-def validate_datetime_format(time_str: str) -> bool:
-    """Проверяет корректность формата времени"""
-    try:
-        datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-        return True
-    except ValueError:
-        logger.error(f"Неверный формат времени: {time_str}")
-        return False
-
-
 def generate_response(date_time_str: str, df: pd.DataFrame) -> str:
     """Генерирует JSON-ответ"""
-    if not validate_datetime_format(date_time_str):
+    # Строка разбирается один раз: и для проверки формата, и для приветствия
+    dt = parse_datetime(date_time_str)
+    if dt is None:
+        logger.error("Неверный формат времени: %s", date_time_str)
         raise ValueError("Неверный формат даты")
 
-    try:
-        currency_api_data = get_currency_rate()
-        currency_rates = format_currency_rates(currency_api_data)
-        logger.info("Курсы валют успешно обработаны")
-    except Exception as e:
-        logger.error(f"Ошибка при обработке курсов валют: {str(e)}")
-        currency_rates = [
-            {"currency": "USD", "rate": 73.21},
-            {"currency": "EUR", "rate": 87.08},
-        ]
-
-    try:
-        cards_data = process_cards_data(df)
-        top_transactions = process_top_transactions(df)
-        stock_prices = get_stock_prices()
-
-        response = {
-            "greeting": get_greeting(date_time_str),
-            "cards": cards_data,
-            "top_transactions": top_transactions,
-            "currency_rates": currency_rates,
-            "stock_prices": stock_prices,
-        }
-
-        logger.info("Успешно сформирован ответ")
-        return json.dumps(response, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Ошибка формирования ответа: {str(e)}")
-        raise
+    # Настройки читаются один раз и передаются в функции API;
+    # кортежи нужны, чтобы списки валют и акций служили ключами кэша
+    settings = load_user_settings()
+    currencies = tuple(settings.get("user_currencies", DEFAULT_CURRENCIES))
+    symbols = tuple(settings.get("user_stocks", DEFAULT_STOCKS))
+
+    # Курсы валют и цены акций запрашиваются параллельно, пока обрабатываются данные по картам
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        currency_future = executor.submit(get_currency_rate, currencies)
+        stocks_future = executor.submit(get_stock_prices, symbols)
+
+        try:
+            cards_data = process_cards_data(df)
+            top_transactions = process_top_transactions(df)
+        except Exception as e:
+            logger.error("Ошибка формирования ответа: %s", e)
+            raise
+
+        try:
+            currency_rates = format_currency_rates(currency_future.result(), currencies)
+            logger.info("Курсы валют успешно обработаны")
+        except Exception as e:
+            logger.error("Ошибка при обработке курсов валют: %s", e)
+            currency_rates = [
+                {"currency": "USD", "rate": 73.21},
+                {"currency": "EUR", "rate": 87.08},
+            ]
+
+        try:
+            stock_prices = stocks_future.result()
+
+            response = {
+                "greeting": get_greeting(dt),
+                "cards": cards_data,
+                "top_transactions": top_transactions,
+                "currency_rates": currency_rates,
+                "stock_prices": stock_prices,
+            }
+
+            logger.info("Успешно сформирован ответ")
+            return dumps_json(response)
+        except Exception as e:
+            logger.error("Ошибка формирования ответа: %s", e)
+            raise
 
 
 def main():
     """Основная функция выполнения"""
+    configure_once()
     try:
         logger.info("Запуск приложения")
         df = load_data(Config.PATH_FILE)
@@ -135,7 +184,7 @@ def main():
         print(json_response)
         logger.info("Приложение завершило работу успешно")
     except Exception as e:
-        logger.critical(f"Критическая ошибка: {str(e)}")
+        logger.critical("Критическая ошибка: %s", e)
         raise
 
 
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 
 import pandas as pd
@@ -117,3 +118,59 @@ def test_get_spending_by_category_positive_amounts_fixed_date():
 
     assert isinstance(result, dict)
     assert result.get("2023-01") == 400
+
+
+def test_get_spending_by_category_categorical_column():
+    """Тест фильтрации по категориальному столбцу без учета регистра"""
+    data = {
+        "Дата операции": pd.to_datetime(["01.01.2023", "15.01.2023"], dayfirst=True),
+        "Категория": pd.Categorical(["Продукты", "Транспорт"]),
+        "Сумма операции": [-1000, -200],
+    }
+    df = pd.DataFrame(data)
+
+    result = get_spending_by_category(df, "продукты ", "2023-02-01")
+
+    assert result == {"2023-01": 1000}
+
+
+def test_get_spending_by_category_reordered_categories():
+    """Тест категориальных столбцов с теми же категориями в другом порядке"""
+    dates = pd.to_datetime(["01.01.2023", "15.01.2023"], dayfirst=True)
+    amounts = [-1000, -200]
+    first = pd.DataFrame(
+        {
+            "Дата операции": dates,
+            "Категория": pd.Categorical(["Продукты", "Транспорт"], categories=["Продукты", "Транспорт"]),
+            "Сумма операции": amounts,
+        }
+    )
+    second = first.assign(
+        Категория=pd.Categorical(["Продукты", "Транспорт"], categories=["Транспорт", "Продукты"])
+    )
+
+    assert get_spending_by_category(first, "продукты", "2023-02-01") == {"2023-01": 1000}
+    assert get_spending_by_category(second, "продукты", "2023-02-01") == {"2023-01": 1000}
+
+
+def test_get_spending_by_category_writes_report_file(tmp_path, monkeypatch):
+    """Тест сохранения отчета в JSON-файл без экранирования кириллицы"""
+    # Отчет по умолчанию пишется в ../reports/report.json относительно рабочего каталога
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "work").mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2023"],
+            "Категория": ["продукты"],
+            "Сумма операции": [-1000.5],
+        }
+    )
+    report_path = tmp_path / "reports" / "report.json"
+
+    result = get_spending_by_category(df, "продукты", "2023-03-01")
+
+    assert json.loads(report_path.read_bytes()) == result == {"2023-01": 1000.5}
+
+    get_spending_by_category(df, "кафе", "2023-03-01")
+    assert "кафе" in report_path.read_text(encoding="utf-8")
@@ -135,3 +135,38 @@ def test_invalid_cashback_values(sample_data_file):
     data = json.loads(result)
 
     assert "Такси" not in data
+
+
+def test_dataframe_passed_directly():
+    """Тест анализа уже загруженного DataFrame без чтения файла"""
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "15.12.2021 18:30:00"],
+            "Статус": ["OK", "OK"],
+            "Кэшбэк": [100, 50],
+            "Категория": ["Супермаркеты", "АЗС"],
+        }
+    )
+
+    result = analyze_cashback_categories("nonexistent_file.xlsx", 2021, 12, df=df)
+    data = json.loads(result)
+
+    assert data == {"Супермаркеты": 100, "АЗС": 50}
+    assert df["Дата операции"].iloc[0] == "01.12.2021 12:00:00"
+
+
+def test_non_canonical_dates_in_file(tmp_path):
+    """Тест разбора дат не в формате load_data при чтении файла"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021", "15.12.2021 18:30"],
+            "Статус": ["OK", "OK"],
+            "Кэшбэк": [100, 50],
+            "Категория": ["Супермаркеты", "АЗС"],
+        }
+    ).to_excel(file_path, index=False)
+
+    data = json.loads(analyze_cashback_categories(str(file_path), 2021, 12))
+
+    assert data == {"Супермаркеты": 100}
@@ -0,0 +1,552 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+import requests
+
+from src import utils
+from src.utils import (
+    _DF_CACHE,
+    Config,
+    Uncached,
+    convert_xlsx_to_parquet,
+    format_currency_rates,
+    get_currency_rate,
+    get_stock_prices,
+    load_data,
+    ttl_cache,
+    _is_cacheable_response,
+    _write_operations_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(monkeypatch):
+    """Фикстура сбрасывает кэши данных и ответов API между тестами"""
+    monkeypatch.setattr(utils, "_bulk_quotes_available", True)
+    _DF_CACHE.clear()
+    get_stock_prices.cache_clear()
+    get_currency_rate.cache_clear()
+
+
+@pytest.fixture
+def operations_file(tmp_path):
+    """Фикстура создает временный Excel-файл с операциями"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "15.12.2021 18:30:00"],
+            "Сумма операции": [-100.5, -200.0],
+        }
+    ).to_excel(file_path, index=False)
+    return str(file_path)
+
+
+def test_load_data_creates_cache(operations_file):
+    """Тест создания Parquet-кэша при первой загрузке"""
+    df = load_data(operations_file)
+
+    assert len(df) == 2
+    assert os.path.exists(f"{operations_file}.parquet")
+
+
+def test_load_data_uses_cache(operations_file):
+    """Тест повторной загрузки из кэша без чтения Excel"""
+    load_data(operations_file)
+    cached = pd.DataFrame({"Сумма операции": [-1.0]})
+    _write_operations_cache(cached, f"{operations_file}.parquet")
+    _DF_CACHE.clear()
+
+    df = load_data(operations_file)
+
+    assert df["Сумма операции"].tolist() == [-1.0]
+
+
+def test_load_data_ignores_cache_of_other_version(operations_file):
+    """Тест перечитывания Excel, если кэш записан другой версией кода"""
+    # Кэш без отметки версии, как у файлов, созданных до ее появления
+    pd.DataFrame({"Сумма операции": [-1.0], "Статус": ["FAILED"]}).to_parquet(f"{operations_file}.parquet")
+
+    df = load_data(operations_file)
+
+    assert len(df) == 2
+    assert "Статус" not in df.columns
+
+    # Кэш пересоздан текущей версией и используется при следующей загрузке
+    _DF_CACHE.clear()
+    with patch("src.utils._read_excel") as mock_read_excel:
+        assert len(load_data(operations_file)) == 2
+    mock_read_excel.assert_not_called()
+
+
+def test_load_data_ignores_stale_cache(operations_file):
+    """Тест перечитывания Excel, если файл новее кэша"""
+    pd.DataFrame({"Сумма операции": [-1.0]}).to_parquet(f"{operations_file}.parquet")
+    os.utime(f"{operations_file}.parquet", (0, 0))
+
+    df = load_data(operations_file)
+
+    assert len(df) == 2
+
+
+def test_load_data_reuses_loaded_dataframe(operations_file):
+    """Тест повторной загрузки из памяти без чтения файлов"""
+    first = load_data(operations_file)
+    first["extra"] = 1
+
+    with patch("src.utils._read_operations") as mock_read:
+        second = load_data(operations_file)
+
+    mock_read.assert_not_called()
+    assert "extra" not in second.columns
+    assert len(second) == 2
+
+
+def test_load_data_from_converted_parquet(tmp_path):
+    """Тест загрузки операций из Parquet файла, полученного из Excel"""
+    xlsx_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "02.12.2021 12:00:00"],
+            "Статус": ["OK", "FAILED"],
+            "Сумма операции": [-100.5, -200.0],
+            "MCC": [5411, 5812],
+        }
+    ).to_excel(xlsx_path, index=False)
+
+    parquet_path = convert_xlsx_to_parquet(str(xlsx_path))
+    df = load_data(parquet_path)
+
+    assert parquet_path == str(tmp_path / "operations.parquet")
+    assert df["Сумма операции"].tolist() == [-100.5]
+    assert "MCC" not in df.columns
+    assert pd.api.types.is_datetime64_any_dtype(df["Дата операции"])
+
+
+def test_load_data_file_not_found(tmp_path):
+    """Тест ошибки при отсутствии файла"""
+    with pytest.raises(FileNotFoundError):
+        load_data(str(tmp_path / "missing.xlsx"))
+
+
+def test_load_data_parses_dates(tmp_path):
+    """Тест однократного преобразования дат с удалением некорректных"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "invalid_date"],
+            "Сумма операции": [-100.5, -200.0],
+        }
+    ).to_excel(file_path, index=False)
+
+    df = load_data(str(file_path))
+
+    assert pd.api.types.is_datetime64_any_dtype(df["Дата операции"])
+    assert df["Дата операции"].tolist() == [pd.Timestamp(2021, 12, 1, 12)]
+    assert df["_year"].tolist() == [2021]
+    assert df["_month"].tolist() == [12]
+
+
+@contextmanager
+def patch_session_get(**kwargs):
+    """Подменяет общую HTTP-сессию и возвращает мок ее метода get"""
+    session = Mock()
+    session.get = Mock(**kwargs)
+    with patch("src.utils._get_session", return_value=session):
+        yield session.get
+
+
+def quote_response(price):
+    """Имитирует ответ Alpha Vantage с котировкой"""
+    response = Mock()
+    response.json.return_value = {"Global Quote": {"05. price": str(price)}}
+    return response
+
+
+def bulk_response(quotes):
+    """Имитирует ответ Alpha Vantage на пакетный запрос котировок"""
+    response = Mock()
+    data = [{"symbol": symbol, "close": str(price)} for symbol, price in quotes.items()]
+    response.json.return_value = {"data": data}
+    return response
+
+
+def premium_response():
+    """Имитирует ответ Alpha Vantage о недоступности премиального эндпоинта"""
+    response = Mock()
+    response.json.return_value = {
+        "Information": "Thank you for using Alpha Vantage! This is a premium endpoint. "
+        "You may subscribe to any of the premium plans at https://www.alphavantage.co/premium/ "
+        "to instantly unlock all premium endpoints"
+    }
+    return response
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices():
+    """Тест получения цен по всем акциям с сохранением порядка"""
+    prices = {"AAPL": 150.123, "MSFT": 300.456, "TSLA": 700.789}
+
+    def fake_get(url, params, **kwargs):
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            return premium_response()
+        return quote_response(prices[params["symbol"]])
+
+    with patch_session_get(side_effect=fake_get):
+        result = get_stock_prices(("AAPL", "MSFT", "TSLA"))
+
+    assert result == [
+        {"stock": "AAPL", "price": 150.12},
+        {"stock": "MSFT", "price": 300.46},
+        {"stock": "TSLA", "price": 700.79},
+    ]
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_skips_failed_symbol():
+    """Тест пропуска акции, по которой запрос завершился ошибкой"""
+
+    def fake_get(url, params, **kwargs):
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            return premium_response()
+        if params["symbol"] == "MSFT":
+            raise requests.exceptions.ConnectionError("нет сети")
+        return quote_response(150)
+
+    with patch_session_get(side_effect=fake_get):
+        result = get_stock_prices(("AAPL", "MSFT"))
+
+    assert result == [{"stock": "AAPL", "price": 150.0}]
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_bulk_request():
+    """Тест получения всех цен одним пакетным запросом"""
+    response = bulk_response({"MSFT": 300.456, "AAPL": 150.123})
+
+    with patch_session_get(return_value=response) as mock_get:
+        result = get_stock_prices(("AAPL", "MSFT"))
+
+    assert result == [{"stock": "AAPL", "price": 150.12}, {"stock": "MSFT", "price": 300.46}]
+    mock_get.assert_called_once()
+    assert mock_get.call_args.kwargs["params"]["symbol"] == "AAPL,MSFT"
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_fetches_missing_from_bulk():
+    """Тест дозапроса акций, которых нет в пакетном ответе"""
+
+    def fake_get(url, params, **kwargs):
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            return bulk_response({"AAPL": 150})
+        return quote_response(700)
+
+    with patch_session_get(side_effect=fake_get) as mock_get:
+        result = get_stock_prices(("AAPL", "TSLA"))
+
+    assert result == [{"stock": "AAPL", "price": 150.0}, {"stock": "TSLA", "price": 700.0}]
+    assert mock_get.call_count == 2
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_premium_bulk_not_retried():
+    """Тест отказа от пакетного запроса после ответа о премиальном эндпоинте"""
+
+    def fake_get(url, params, **kwargs):
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            return premium_response()
+        return quote_response(150)
+
+    with patch_session_get(side_effect=fake_get) as mock_get:
+        get_stock_prices(("AAPL",))
+        get_stock_prices.cache_clear()
+        get_stock_prices(("AAPL",))
+
+    functions = [call.kwargs["params"]["function"] for call in mock_get.call_args_list]
+    assert functions == ["REALTIME_BULK_QUOTES", "GLOBAL_QUOTE", "GLOBAL_QUOTE"]
+
+
+RATE_LIMIT_MESSAGE = (
+    "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+    "Please subscribe to any of the premium plans at https://www.alphavantage.co/premium/ "
+    "to instantly remove all daily rate limits."
+)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [[], {"Information": 123}, {"data": None}, {"data": ["AAPL"]}, {"Information": RATE_LIMIT_MESSAGE}],
+)
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_unexpected_bulk_response(body):
+    """Тест запроса акций по одной, если пакетный ответ имеет неожиданный вид"""
+
+    def fake_get(url, params, **kwargs):
+        response = Mock()
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            response.json.return_value = body
+            return response
+        return quote_response(150)
+
+    with patch_session_get(side_effect=fake_get):
+        result = get_stock_prices(("AAPL",))
+
+    assert result == [{"stock": "AAPL", "price": 150.0}]
+    # Пакетный эндпоинт отключается только сообщением о премиальном эндпоинте
+    assert utils._bulk_quotes_available
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", None)
+def test_get_stock_prices_without_api_key():
+    """Тест ошибки при отсутствии API ключа"""
+    with pytest.raises(ValueError):
+        get_stock_prices(("AAPL",))
+
+
+@patch.object(Config, "CURRENCY_API_KEY", "test_key")
+def test_get_currency_rate():
+    """Тест получения курсов валют через общую сессию"""
+    response = Mock()
+    response.json.return_value = {"rates": {"USD": 0.0125, "EUR": 0.0113}}
+
+    with patch_session_get(return_value=response) as mock_get:
+        result = get_currency_rate(("USD", "EUR"))
+
+    assert result == {"rates": {"USD": 0.0125, "EUR": 0.0113}}
+    mock_get.assert_called_once()
+    assert mock_get.call_args.kwargs["params"] == {"symbols": "USD,EUR", "base": "RUB"}
+
+
+@patch.object(Config, "CURRENCY_API_KEY", "test_key")
+def test_get_currency_rate_network_error():
+    """Тест пустых курсов при ошибке сети"""
+    with patch_session_get(side_effect=requests.exceptions.Timeout("timeout")):
+        result = get_currency_rate(("USD",))
+
+    assert result == {"rates": {}}
+
+
+def test_load_data_drops_unused_columns(tmp_path):
+    """Тест загрузки только используемых столбцов"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00"],
+            "Сумма операции": [-100.5],
+            "MCC": [5411],
+        }
+    ).to_excel(file_path, index=False)
+
+    df = load_data(str(file_path))
+
+    assert "MCC" not in df.columns
+    assert "Сумма операции" in df.columns
+
+
+def test_load_data_downcasts_only_lossless_columns(tmp_path):
+    """Тест перевода в float32 только столбцов, которые не теряют точность"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "02.12.2021 12:00:00"],
+            "Сумма операции": [-190044.51, -100.01],
+            "Кэшбэк": [26, None],
+        }
+    ).to_excel(file_path, index=False)
+
+    df = load_data(str(file_path))
+
+    assert df["Кэшбэк"].dtype == "float32"
+    assert df["Сумма операции"].dtype == "float64"
+    assert df["Сумма операции"].tolist() == [-190044.51, -100.01]
+
+
+def test_format_currency_rates():
+    """Тест пересчета курсов в рубли за единицу валюты"""
+    api_data = {"rates": {"USD": 0.0125, "EUR": 0.0113, "CNY": 0}}
+
+    result = format_currency_rates(api_data, ["USD", "EUR", "CNY", "GBP"])
+
+    assert result == [
+        {"currency": "USD", "rate": 80.0},
+        {"currency": "EUR", "rate": 88.5},
+        {"currency": "CNY", "rate": 0.0},
+        {"currency": "GBP", "rate": 1.0},
+    ]
+
+
+def test_load_data_keeps_only_successful_operations(tmp_path):
+    """Тест фильтрации операций по статусу при загрузке"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "02.12.2021 12:00:00", "03.12.2021 12:00:00"],
+            "Статус": ["OK", "FAILED", " ok "],
+            "Сумма операции": [-100.5, -200.0, -300.0],
+        }
+    ).to_excel(file_path, index=False)
+
+    df = load_data(str(file_path))
+
+    assert "Статус" not in df.columns
+    assert df["Сумма операции"].tolist() == [-100.5, -300.0]
+
+
+def test_ttl_cache_reuses_result():
+    """Тест повторного использования результата до истечения TTL"""
+    calls = []
+
+    @ttl_cache(60)
+    def fetch(key):
+        calls.append(key)
+        return key * 2
+
+    assert fetch(2) == 4
+    assert fetch(2) == 4
+    assert fetch(3) == 6
+    assert calls == [2, 3]
+
+
+def test_ttl_cache_expires():
+    """Тест повторного вызова после истечения TTL"""
+    calls = []
+
+    @ttl_cache(0)
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert fetch() == 1
+    assert fetch() == 2
+
+
+def test_ttl_cache_deduplicates_concurrent_calls():
+    """Тест одного вызова функции при одновременных запросах"""
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @ttl_cache(60)
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(fetch)
+        started.wait(5)
+        others = [executor.submit(fetch) for _ in range(3)]
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+
+
+def test_ttl_cache_skips_uncached_result():
+    """Тест того, что результат в Uncached возвращается, но не сохраняется"""
+    calls = []
+
+    @ttl_cache(60)
+    def fetch():
+        calls.append(1)
+        return Uncached("fallback") if len(calls) == 1 else "result"
+
+    assert fetch() == "fallback"
+    assert fetch() == "result"
+    assert fetch() == "result"
+    assert len(calls) == 2
+
+
+def test_ttl_cache_respects_maxsize():
+    """Тест вытеснения самого давно использованного результата"""
+    calls = []
+
+    @ttl_cache(60, maxsize=2)
+    def fetch(key):
+        calls.append(key)
+        return key
+
+    fetch(1)
+    fetch(2)
+    fetch(1)
+    fetch(3)  # вытесняет 2, к которому обращались раньше всех
+    fetch(1)
+    fetch(2)
+
+    assert calls == [1, 2, 3, 2]
+
+
+@patch.object(Config, "CURRENCY_API_KEY", "test_key")
+def test_get_currency_rate_does_not_cache_errors():
+    """Тест получения реальных курсов сразу после восстановления сети"""
+    response = Mock()
+    response.json.return_value = {"rates": {"USD": 0.0125}}
+
+    with patch_session_get(side_effect=[requests.exceptions.ConnectionError("нет сети"), response]):
+        assert get_currency_rate(("USD",)) == {"rates": {}}
+        assert get_currency_rate(("USD",)) == {"rates": {"USD": 0.0125}}
+
+
+@patch.object(Config, "ALPHA_VANTAGE_API_KEY", "test_key")
+def test_get_stock_prices_does_not_cache_partial_result():
+    """Тест повторного запроса акций, цены которых не удалось получить"""
+
+    def fake_get(url, params, **kwargs):
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            return premium_response()
+        if params["symbol"] == "MSFT" and fake_get.msft_down:
+            raise requests.exceptions.ConnectionError("нет сети")
+        return quote_response(150)
+
+    fake_get.msft_down = True
+    with patch_session_get(side_effect=fake_get):
+        assert get_stock_prices(("AAPL", "MSFT")) == [{"stock": "AAPL", "price": 150.0}]
+        fake_get.msft_down = False
+        assert len(get_stock_prices(("AAPL", "MSFT"))) == 2
+
+
+def test_import_does_not_create_http_cache(tmp_path):
+    """Тест того, что импорт модуля не создает каталог HTTP-кэша, а первый запрос сессии создает"""
+    # Копия пакета во временном каталоге: cache/ создается рядом с src, а в репозитории он уже может быть
+    package_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    shutil.copytree(package_dir, tmp_path / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    code = (
+        "import os\n"
+        "import src.utils as utils\n"
+        "print(os.path.exists('cache'))\n"
+        "utils._get_session()\n"
+        "print(os.path.exists('cache') or utils.requests_cache is None)\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split() == ["False", "True"]
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ({"Global Quote": {"05. price": "150.0"}}, True),
+        ({"rates": {"USD": 0.0125}}, True),
+        ({"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}, False),
+        ({"Information": "This is a premium endpoint."}, False),
+        ({"Error Message": "Invalid API call."}, False),
+        ({"success": False, "error": {"code": 101}}, False),
+    ],
+)
+def test_is_cacheable_response(body, expected):
+    """Тест отбора ответов API, которые можно хранить в HTTP-кэше"""
+    response = Mock()
+    response.json.return_value = body
+    assert _is_cacheable_response(response) is expected
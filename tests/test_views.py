@@ -1,10 +1,21 @@
+import json
+import threading
 from datetime import datetime
+from unittest.mock import patch
 
 import numpy as np
 import pandas as pd
 import pytest
 
-from src.views import get_greeting, process_cards_data, process_top_transactions
+from src.utils import DEFAULT_CURRENCIES, DEFAULT_STOCKS, Config, load_data, load_user_settings
+from src.views import (
+    generate_response,
+    get_greeting,
+    greetings_for,
+    parse_datetime,
+    process_cards_data,
+    process_top_transactions,
+)
 
 
 # Тест на обычные случаи
@@ -58,6 +69,136 @@ def test_get_greeting_edge_cases(hour, expected):
     assert get_greeting(time_str) == expected
 
 
+# Тест на векторное получение приветствий
+def test_greetings_for_matches_scalar_greeting():
+    """Тестирование совпадения векторных приветствий с приветствием для одной строки"""
+    times = np.arange("2023-01-01T00", "2023-01-02T00", dtype="datetime64[h]") + np.timedelta64(30, "m")
+    time_strings = [str(t).replace("T", " ") for t in times.astype("datetime64[s]")]
+
+    assert greetings_for(times).tolist() == [get_greeting(time_str) for time_str in time_strings]
+
+
+# Тест на приветствие по уже разобранному времени
+def test_get_greeting_accepts_datetime():
+    """Тестирование приветствия для объекта datetime"""
+    assert get_greeting(datetime(2023, 1, 1, 22, 59)) == "Добрый вечер"
+
+
+# Тест на разбор строки с датой и временем
+@pytest.mark.parametrize(
+    "time_str, expected",
+    [
+        ("2023-05-15 14:30:00", datetime(2023, 5, 15, 14, 30)),
+        ("15.05.2023 14:30", None),
+        ("2023-05-15 25:00:00", None),
+    ],
+)
+def test_parse_datetime(time_str, expected):
+    """Тестирование разбора строки без исключений при ошибке"""
+    assert parse_datetime(time_str) == expected
+
+
+# Тест на некорректный час в строке правильной длины
+@pytest.mark.parametrize(
+    "time_str",
+    [
+        "2023-01-01 24:00:00",
+        "2023-01-01T10:00:00",
+        "2023-01-01 1a:00:00",
+        "2023-05-15 ²3:00:00",
+    ],
+)
+def test_get_greeting_invalid_hour(time_str):
+    """Тестирование строк, не проходящих быстрый разбор часа"""
+    assert get_greeting(time_str) == "Добрый день"
+
+
+# Тест на проверку формата даты при формировании ответа
+def test_generate_response_invalid_format():
+    """Тест ошибки при неверном формате даты запроса"""
+    with pytest.raises(ValueError, match="Неверный формат даты"):
+        generate_response("15.05.2023 14:30", pd.DataFrame())
+
+
+# Тест на формирование полного ответа
+@patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+@patch("src.views.get_stock_prices", return_value=[{"stock": "AAPL", "price": 150.12}])
+@patch("src.views.get_currency_rate", return_value={"rates": {"USD": 0.0125}})
+@patch("src.views.format_currency_rates", return_value=[{"currency": "USD", "rate": 80.0}])
+def test_generate_response(mock_format, mock_rates, mock_stocks, mock_settings):
+    """Тест структуры JSON-ответа"""
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2023 10:00:00"],
+            "Номер карты": ["*1234"],
+            "Сумма операции": [-100.0],
+            "Категория": ["Супермаркеты"],
+            "Описание": ["Магнит"],
+        }
+    )
+
+    data = json.loads(generate_response("2023-05-15 14:30:00", df))
+
+    assert data["greeting"] == "Добрый день"
+    assert data["cards"] == [{"last_digits": "1234", "total_spent": 100.0, "cashback": 1.0}]
+    assert data["top_transactions"] == [
+        {"date": "01.01.2023", "amount": 100.0, "category": "Супермаркеты", "description": "Магнит"}
+    ]
+    assert data["currency_rates"] == [{"currency": "USD", "rate": 80.0}]
+    assert data["stock_prices"] == [{"stock": "AAPL", "price": 150.12}]
+    mock_settings.assert_called_once()
+    mock_rates.assert_called_once_with(("USD",))
+    mock_format.assert_called_once_with({"rates": {"USD": 0.0125}}, ("USD",))
+    mock_stocks.assert_called_once_with(("AAPL",))
+
+
+# Тест на ответ при неверных пользовательских настройках
+@pytest.mark.parametrize("settings_content", [None, "[]", "не JSON"])
+def test_generate_response_with_broken_settings(tmp_path, settings_content):
+    """Тест использования настроек по умолчанию, если файл настроек не задан или некорректен"""
+    settings_path = None
+    if settings_content is not None:
+        settings_path = tmp_path / "user_settings.json"
+        settings_path.write_text(settings_content, encoding="utf-8")
+
+    load_user_settings.cache_clear()
+    try:
+        with patch.object(Config, "SETTINGS_PATH", settings_path and str(settings_path)), patch(
+            "src.views.get_currency_rate", return_value={"rates": {}}
+        ) as mock_rates, patch("src.views.get_stock_prices", return_value=[]) as mock_stocks:
+            data = json.loads(generate_response("2023-05-15 14:30:00", pd.DataFrame(columns=["Сумма операции"])))
+    finally:
+        load_user_settings.cache_clear()
+
+    assert data["greeting"] == "Добрый день"
+    mock_rates.assert_called_once_with(DEFAULT_CURRENCIES)
+    mock_stocks.assert_called_once_with(DEFAULT_STOCKS)
+
+
+# Тест на параллельный запрос курсов валют и цен акций
+def test_generate_response_fetches_apis_concurrently():
+    """Тест того, что запросы к API не ждут друг друга"""
+    # Барьер пропустит запросы, только если оба выполняются одновременно
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_rates(currencies):
+        barrier.wait()
+        return {"rates": {"USD": 0.0125}}
+
+    def fake_stocks(symbols):
+        barrier.wait()
+        return []
+
+    with patch("src.views.get_currency_rate", side_effect=fake_rates), patch(
+        "src.views.get_stock_prices", side_effect=fake_stocks
+    ), patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": []}):
+        df = pd.DataFrame(columns=["Номер карты", "Сумма операции"])
+        data = json.loads(generate_response("2023-05-15 14:30:00", df))
+
+    assert data["currency_rates"] == [{"currency": "USD", "rate": 80.0}]
+    assert data["stock_prices"] == []
+
+
 @pytest.fixture
 def sample_dataframe():
     """Фикстура с тестовыми данными карт"""
@@ -167,6 +308,31 @@ def test_process_cards_data_missing_values():
     assert result[0]["total_spent"] == pytest.approx(100.00)
 
 
+# Тест на точный кэшбэк для данных, загруженных из файла
+def test_process_cards_data_exact_cashback_after_load(tmp_path):
+    """Тест того, что целые суммы после загрузки не дают погрешности float32 в кэшбэке"""
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.12.2021 12:00:00", "02.12.2021 12:00:00"],
+            "Номер карты": ["*1234", "*5678"],
+            "Сумма операции": [-1334, -57],
+        }
+    ).to_excel(file_path, index=False)
+
+    result = process_cards_data(load_data(str(file_path)))
+
+    assert [card["cashback"] for card in result] == [13.34, 0.57]
+
+
+# Тест на неизменность исходных данных
+def test_process_cards_data_keeps_input(sample_dataframe):
+    """Тест что обработка не добавляет столбцы в исходный DataFrame"""
+    columns = list(sample_dataframe.columns)
+    process_cards_data(sample_dataframe)
+    assert list(sample_dataframe.columns) == columns
+
+
 @pytest.fixture
 def sample_transactions():
     """Фикстура с тестовыми данными транзакций"""
@@ -284,3 +450,12 @@ def test_amount_rounding():
 
     assert result[0]["amount"] == pytest.approx(100.50)
     assert result[1]["amount"] == pytest.approx(100.50)
+
+
+# Тест на выбор самых крупных расходов
+def test_top_transactions_are_largest_expenses(sample_transactions):
+    """Тест что в топ попадают операции с наибольшими суммами расходов"""
+    result = process_top_transactions(sample_transactions, n=2)
+
+    assert [t["description"] for t in result] == ["iPhone", "Zara"]
+    assert [t["amount"] for t in result] == [1500.25, 1200.00]